@@ -4,86 +4,173 @@ Migrate Chinook SQLite database to MongoDB.
 
 This script reads all tables from the Chinook SQLite database and migrates them
 to MongoDB collections in a database called 'chinook_mongo'.
+
+Requires pymongo>=4.9, whose insert_many encodes each document to BSON only
+once; rows are sent in unordered insert_many batches to take advantage of it.
 """
 
 import sqlite3
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from pymongo import MongoClient
+from pymongo import IndexModel, MongoClient
 from datetime import datetime
 
+# Number of rows read from SQLite and sent to MongoDB per insert_many call
+BATCH_SIZE = 1000
+
+# Number of tables migrated concurrently
+MAX_WORKERS = 8
+
+# The migration only reads from SQLite: map the file into memory and use a
+# larger page cache so full-table scans avoid read() syscalls
+SQLITE_READ_PRAGMAS = """
+PRAGMA query_only=1;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-65536;
+PRAGMA temp_store=MEMORY;
+"""
+
 
 def connect_sqlite(db_path):
     """Connect to SQLite database."""
     print(f"Connecting to SQLite database: {db_path}")
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    return open_sqlite_reader(db_path)
+
+
+def open_sqlite_reader(db_path):
+    """Open a SQLite connection tuned for read-only bulk scans."""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.executescript(SQLITE_READ_PRAGMAS)
     return conn
 
 
+def get_wire_compressors():
+    """Get the wire compressors PyMongo can use, best first.
+
+    zstd and snappy need optional modules that aren't project dependencies, so
+    they are only requested when installed; zlib is always available.
+    """
+    try:
+        # Same checks PyMongo runs itself before warning about a compressor
+        from pymongo.compression_support import _have_snappy, _have_zstd
+    except ImportError:
+        return "zlib"
+
+    compressors = []
+    if _have_zstd():
+        compressors.append("zstd")
+    if _have_snappy():
+        compressors.append("snappy")
+    compressors.append("zlib")
+    return ",".join(compressors)
+
+
 def connect_mongodb(host="localhost", port=27017):
     """Connect to MongoDB."""
     print(f"Connecting to MongoDB at {host}:{port}")
-    client = MongoClient(host, port)
+    # Pool must cover every migration worker thread sharing this client.
+    # Compression shrinks the text-heavy BSON batches on the wire, and a
+    # one-shot migration doesn't need retryable or journaled writes.
+    client = MongoClient(
+        host,
+        port,
+        compressors=get_wire_compressors(),
+        maxPoolSize=32,
+        retryWrites=False,
+        w=1,
+        journal=False,
+    )
     return client
 
 
 def get_table_names(sqlite_conn):
-    """Get all table names from SQLite database."""
+    """Get all user table names from SQLite database."""
     cursor = sqlite_conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+    # Skip SQLite's internal tables (sqlite_sequence, sqlite_stat1, ...)
+    cursor.execute(
+        "SELECT name FROM sqlite_master "
+        "WHERE type='table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' "
+        "ORDER BY name"
+    )
     return [row[0] for row in cursor.fetchall()]
 
 
-def get_table_data(sqlite_conn, table_name):
-    """Get all data from a table."""
-    cursor = sqlite_conn.cursor()
-    cursor.execute(f"SELECT * FROM {table_name}")
-    columns = [description[0] for description in cursor.description]
-    rows = cursor.fetchall()
-    return columns, rows
+def get_table_counts(sqlite_conn, table_names):
+    """Get the row count of every table in a single query."""
+    if not table_names:
+        return {}
 
+    # Table names can't be bound as parameters, only the label column can
+    count_query = " UNION ALL ".join(
+        f"SELECT ?, COUNT(*) FROM {table_name}" for table_name in table_names
+    )
+    return dict(sqlite_conn.execute(count_query, table_names).fetchall())
 
-def row_to_document(row, columns):
-    """Convert SQLite row to MongoDB document."""
-    doc = {}
-    for i, col in enumerate(columns):
-        value = row[i]
-        # Convert None to null, keep other values as-is
-        doc[col] = value
-    return doc
+
+def print_report(lines):
+    """Print a block of lines with a single write to stdout."""
+    # print() writes its end separately, so append the newline ourselves
+    print("\n".join(lines) + "\n", end="", flush=True)
 
 
 def migrate_table(sqlite_conn, mongo_db, table_name):
-    """Migrate a single table to MongoDB collection."""
-    print(f"\nMigrating table: {table_name}")
+    """Migrate a single table to MongoDB collection.
 
-    # Get table data
-    columns, rows = get_table_data(sqlite_conn, table_name)
-    print(f"  Columns: {', '.join(columns)}")
-    print(f"  Rows: {len(rows)}")
+    Returns a (table_name, inserted_count) tuple. The table's progress report
+    is printed in one call so reports from concurrent workers don't interleave.
+    """
+    report = [f"\nMigrating table: {table_name}"]
 
-    if len(rows) == 0:
-        print(f"  Skipping empty table")
-        return
+    # Stream table data straight off the SQLite cursor
+    cursor = sqlite_conn.execute(f"SELECT * FROM {table_name}")
+    columns = [description[0] for description in cursor.description]
+    report.append(f"  Columns: {', '.join(columns)}")
 
-    # Convert rows to documents
-    documents = []
-    for row in rows:
-        doc = row_to_document(row, columns)
-        documents.append(doc)
+    rows = cursor.fetchmany(BATCH_SIZE)
+    if not rows:
+        report.append("  Rows: 0")
+        report.append("  Skipping empty table")
+        print_report(report)
+        return table_name, 0
 
-    # Insert into MongoDB
+    # Insert into MongoDB (the collection was reset by drop_collections)
     collection = mongo_db[table_name]
 
-    # Drop collection if it exists
-    collection.drop()
+    # Insert documents in chunks so the whole table is never held in memory
+    inserted = 0
+    while rows:
+        # Omit NULL columns rather than storing explicit nulls
+        documents = [
+            {column: value for column, value in zip(columns, row) if value is not None}
+            for row in rows
+        ]
+        result = collection.insert_many(
+            documents, ordered=False, bypass_document_validation=True
+        )
+        inserted += len(result.inserted_ids)
+        rows = cursor.fetchmany(BATCH_SIZE)
+
+    report.append(f"  Rows: {inserted}")
+    report.append(f"  Inserted {inserted} documents into collection '{table_name}'")
+    print_report(report)
+
+    return table_name, inserted
+
+
+def migrate_table_worker(db_path, mongo_db, table_name):
+    """Migrate a table on a worker thread using its own SQLite connection."""
+    sqlite_conn = open_sqlite_reader(db_path)
+    try:
+        return migrate_table(sqlite_conn, mongo_db, table_name)
+    finally:
+        sqlite_conn.close()
 
-    # Insert documents
-    result = collection.insert_many(documents)
-    print(f"  Inserted {len(result.inserted_ids)} documents into collection '{table_name}'")
 
-    return len(result.inserted_ids)
+def drop_collections(mongo_db, table_names):
+    """Drop any existing collections left over from a previous migration."""
+    for table_name in table_names:
+        mongo_db[table_name].drop()
 
 
 def create_indexes(mongo_db):
@@ -91,71 +178,99 @@ def create_indexes(mongo_db):
     print("\nCreating indexes...")
 
     # Album indexes
-    mongo_db.Album.create_index("AlbumId", unique=True)
-    mongo_db.Album.create_index("ArtistId")
+    mongo_db.Album.create_indexes([
+        IndexModel("AlbumId", unique=True, background=True),
+        IndexModel("ArtistId", background=True),
+    ])
 
     # Artist indexes
-    mongo_db.Artist.create_index("ArtistId", unique=True)
+    mongo_db.Artist.create_indexes([
+        IndexModel("ArtistId", unique=True, background=True),
+    ])
 
     # Customer indexes
-    mongo_db.Customer.create_index("CustomerId", unique=True)
-    mongo_db.Customer.create_index("SupportRepId")
+    mongo_db.Customer.create_indexes([
+        IndexModel("CustomerId", unique=True, background=True),
+        IndexModel("SupportRepId", background=True),
+    ])
 
     # Employee indexes
-    mongo_db.Employee.create_index("EmployeeId", unique=True)
-    mongo_db.Employee.create_index("ReportsTo")
+    mongo_db.Employee.create_indexes([
+        IndexModel("EmployeeId", unique=True, background=True),
+        IndexModel("ReportsTo", background=True),
+    ])
 
     # Genre indexes
-    mongo_db.Genre.create_index("GenreId", unique=True)
+    mongo_db.Genre.create_indexes([
+        IndexModel("GenreId", unique=True, background=True),
+    ])
 
     # Invoice indexes
-    mongo_db.Invoice.create_index("InvoiceId", unique=True)
-    mongo_db.Invoice.create_index("CustomerId")
+    mongo_db.Invoice.create_indexes([
+        IndexModel("InvoiceId", unique=True, background=True),
+        IndexModel("CustomerId", background=True),
+    ])
 
     # InvoiceLine indexes
-    mongo_db.InvoiceLine.create_index("InvoiceLineId", unique=True)
-    mongo_db.InvoiceLine.create_index("InvoiceId")
-    mongo_db.InvoiceLine.create_index("TrackId")
+    mongo_db.InvoiceLine.create_indexes([
+        IndexModel("InvoiceLineId", unique=True, background=True),
+        IndexModel("InvoiceId", background=True),
+        IndexModel("TrackId", background=True),
+    ])
 
     # MediaType indexes
-    mongo_db.MediaType.create_index("MediaTypeId", unique=True)
+    mongo_db.MediaType.create_indexes([
+        IndexModel("MediaTypeId", unique=True, background=True),
+    ])
 
     # Playlist indexes
-    mongo_db.Playlist.create_index("PlaylistId", unique=True)
+    mongo_db.Playlist.create_indexes([
+        IndexModel("PlaylistId", unique=True, background=True),
+    ])
 
     # PlaylistTrack indexes (composite primary key)
-    mongo_db.PlaylistTrack.create_index([("PlaylistId", 1), ("TrackId", 1)], unique=True)
-    mongo_db.PlaylistTrack.create_index("TrackId")
+    mongo_db.PlaylistTrack.create_indexes([
+        IndexModel([("PlaylistId", 1), ("TrackId", 1)], unique=True, background=True),
+        IndexModel("TrackId", background=True),
+    ])
 
     # Track indexes
-    mongo_db.Track.create_index("TrackId", unique=True)
-    mongo_db.Track.create_index("AlbumId")
-    mongo_db.Track.create_index("MediaTypeId")
-    mongo_db.Track.create_index("GenreId")
+    mongo_db.Track.create_indexes([
+        IndexModel("TrackId", unique=True, background=True),
+        IndexModel("AlbumId", background=True),
+        IndexModel("MediaTypeId", background=True),
+        IndexModel("GenreId", background=True),
+    ])
 
     print("  Indexes created successfully")
 
 
-def verify_migration(sqlite_conn, mongo_db):
-    """Verify that the migration was successful by comparing counts."""
+def verify_migration(mongo_db, sqlite_counts, inserted_counts):
+    """Verify that the migration was successful by comparing counts.
+
+    sqlite_counts are the source row counts taken before migrating (reused so
+    SQLite isn't scanned a second time) and inserted_counts are the documents
+    each table's migration reported; both must match the MongoDB count.
+    """
     print("\nVerifying migration...")
 
-    table_names = get_table_names(sqlite_conn)
     all_match = True
 
-    for table_name in table_names:
-        # Get SQLite count
-        cursor = sqlite_conn.cursor()
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        sqlite_count = cursor.fetchone()[0]
+    for table_name in sorted(sqlite_counts):
+        sqlite_count = sqlite_counts[table_name]
+        inserted_count = inserted_counts.get(table_name, 0)
 
-        # Get MongoDB count
-        mongo_count = mongo_db[table_name].count_documents({})
+        # Get MongoDB count from collection metadata
+        mongo_count = mongo_db[table_name].estimated_document_count()
 
-        match = "✓" if sqlite_count == mongo_count else "✗"
-        print(f"  {match} {table_name}: SQLite={sqlite_count}, MongoDB={mongo_count}")
+        counts_match = sqlite_count == inserted_count == mongo_count
+        match = "✓" if counts_match else "✗"
+        print(
+            f"  {match} {table_name}: SQLite={sqlite_count}, "
+            f"Inserted={inserted_count}, MongoDB={mongo_count}"
+        )
 
-        if sqlite_count != mongo_count:
+        if not counts_match:
             all_match = False
 
     return all_match
@@ -187,18 +302,29 @@ def main():
         table_names = get_table_names(sqlite_conn)
         print(f"\nFound {len(table_names)} tables: {', '.join(table_names)}")
 
-        # Migrate each table
-        total_docs = 0
-        for table_name in table_names:
-            docs_inserted = migrate_table(sqlite_conn, mongo_db, table_name)
-            if docs_inserted:
-                total_docs += docs_inserted
+        # Skip empty tables up front instead of scanning them
+        table_counts = get_table_counts(sqlite_conn, table_names)
+        empty_tables = [name for name in table_names if not table_counts[name]]
+        if empty_tables:
+            print(f"Skipping empty tables: {', '.join(empty_tables)}")
 
-        # Create indexes
+        # Reset collections and build indexes before inserting, so unique
+        # constraints are enforced as documents arrive
+        drop_collections(mongo_db, table_names)
         create_indexes(mongo_db)
 
-        # Verify migration
-        success = verify_migration(sqlite_conn, mongo_db)
+        # Migrate tables concurrently; the work is SQLite/MongoDB I/O bound
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(migrate_table_worker, sqlite_db_path, mongo_db, table_name)
+                for table_name in table_names
+                if table_counts[table_name]
+            ]
+            inserted_counts = dict(future.result() for future in as_completed(futures))
+        total_docs = sum(inserted_counts.values())
+
+        # Verify migration against the SQLite counts taken before migrating
+        success = verify_migration(mongo_db, table_counts, inserted_counts)
 
         print("\n" + "=" * 60)
         if success:
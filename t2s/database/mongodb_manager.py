@@ -1,15 +1,26 @@
 """MongoDB-specific database management for T2S."""
 
+import asyncio
 import logging
+import re
+from collections import Counter
+from itertools import chain
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import pandas as pd
+from bson import json_util
 from pymongo import MongoClient
+from pymongo.database import Database
 from pymongo.errors import ConnectionFailure, PyMongoError
 from rich.console import Console
 
 from ..core.config import Config, DatabaseConfig
 
+# MQL parsing patterns, compiled once rather than on every query
+_COMMENT_RE = re.compile(r'//.*')
+_DIRECT_DB_RE = re.compile(r'^db\.(\w+)\s*\((.*)\)', re.DOTALL)
+_MQL_RE = re.compile(r'db\.(\w+)\.(\w+)\s*\((.*)\)', re.DOTALL)
+
 
 class MongoDBManager:
     """Manages MongoDB connections and query execution."""
@@ -19,7 +30,7 @@ class MongoDBManager:
         self.config = config
         self.console = Console()
         self.logger = logging.getLogger(__name__)
-        self.connections: Dict[str, MongoClient] = {}
+        self.connections: Dict[str, Tuple[MongoClient, Optional[Database]]] = {}
 
     def _create_connection_string(self, db_config: DatabaseConfig) -> str:
         """Create a MongoDB connection string."""
@@ -44,17 +55,31 @@ class MongoDBManager:
             connection_string = self._create_connection_string(db_config)
 
             try:
-                self.connections[db_name] = MongoClient(
+                client = MongoClient(
                     connection_string,
                     serverSelectionTimeoutMS=5000
                 )
                 # Test connection
-                self.connections[db_name].admin.command('ping')
+                client.admin.command('ping')
             except ConnectionFailure as e:
                 self.logger.error(f"Failed to connect to MongoDB: {e}")
                 raise RuntimeError(f"MongoDB connection failed: {str(e)}")
 
-        return self.connections[db_name]
+            # Bind the configured database once so callers don't rebuild it per query
+            db = client[db_config.database] if db_config.database else None
+            self.connections[db_name] = (client, db)
+
+        return self.connections[db_name][0]
+
+    def get_db(self, db_name: str) -> Database:
+        """Get the cached database handle for a MongoDB connection."""
+        self.get_connection(db_name)
+        db = self.connections[db_name][1]
+
+        if db is None:
+            raise ValueError("MongoDB database name not specified in configuration")
+
+        return db
 
     async def test_connection(self, db_name: str) -> bool:
         """Test a MongoDB connection."""
@@ -69,13 +94,7 @@ class MongoDBManager:
     async def execute_query(self, mql: str, db_name: str) -> Dict[str, Any]:
         """Execute a MongoDB query and return results."""
         try:
-            client = self.get_connection(db_name)
-            db_config = self.config.config.databases[db_name]
-
-            if not db_config.database:
-                raise ValueError("MongoDB database name not specified in configuration")
-
-            db = client[db_config.database]
+            db = self.get_db(db_name)
 
             # Parse and execute the MQL query
             # MQL can be in various forms:
@@ -101,6 +120,7 @@ class MongoDBManager:
         - Unquoted keys: {$lookup: ...} -> {"$lookup": ...}
         - Already-quoted keys: {"albums.Title": ...} -> unchanged
         - String values: {msg: "Hello: World"} -> {"msg": "Hello: World"}
+        - Single-quoted strings: {genre: 'Rock'} -> {"genre": "Rock"}
         - Arrays: ["$field"] -> unchanged
         - Nested objects: recursive processing
         """
@@ -112,20 +132,31 @@ class MongoDBManager:
         while i < len(js_str):
             char = js_str[i]
 
-            # Track string boundaries (both single and double quotes)
+            # Track string boundaries (both single and double quotes);
+            # single-quoted strings are re-emitted with JSON double quotes
             if char in ('"', "'") and (i == 0 or js_str[i-1] != '\\'):
                 if not in_string:
                     in_string = True
                     string_char = char
+                    result.append('"')
                 elif char == string_char:
                     in_string = False
                     string_char = None
-                result.append(char)
+                    result.append('"')
+                elif char == '"':
+                    # Double quote inside a single-quoted string
+                    result.append('\\"')
+                else:
+                    result.append(char)
                 i += 1
                 continue
 
-            # Inside string, just copy character
+            # Inside string, just copy character (JSON has no \' escape)
             if in_string:
+                if string_char == "'" and js_str.startswith("\\'", i):
+                    result.append("'")
+                    i += 2
+                    continue
                 result.append(char)
                 i += 1
                 continue
@@ -184,20 +215,108 @@ class MongoDBManager:
 
         return ''.join(result)
 
+    def _cursor_to_dataframe(self, cursor) -> pd.DataFrame:
+        """Build a display DataFrame from a result cursor."""
+        # Peek at the first document so empty results skip record inference
+        first = next(cursor, None)
+        if first is None:
+            return pd.DataFrame()
+
+        df = pd.DataFrame.from_records(chain((first,), cursor))
+
+        # Convert ObjectId to string for display
+        if '_id' in df.columns:
+            df['_id'] = df['_id'].astype(str)
+
+        return df
+
+    def _parse_mql_arguments(self, args_str: str) -> List[Any]:
+        """Parse the argument list of an MQL method call as MongoDB extended JSON."""
+        args_str = args_str.strip()
+        if not args_str:
+            return []
+
+        try:
+            # Convert JavaScript object notation to valid JSON and parse the
+            # arguments as one array, so every positional argument is kept
+            return json_util.loads(f"[{self._quote_unquoted_keys(args_str)}]")
+        except Exception as parse_err:
+            self.logger.error(f"Query parsing failed: {parse_err}")
+            self.logger.debug(f"Original query: {args_str[:200]}")
+            raise ValueError(f"Cannot parse query parameters. Query: {args_str[:100]}... Error: {parse_err}")
+
+    def _do_find(self, collection, args: List[Any]) -> Dict[str, Any]:
+        """Run find(filter, projection)."""
+        query = args[0] if args and isinstance(args[0], dict) else {}
+        projection = args[1] if len(args) > 1 and isinstance(args[1], dict) else None
+
+        df = self._cursor_to_dataframe(collection.find(query, projection, batch_size=1000))
+
+        return {
+            "data": df,
+            "rows_affected": len(df),
+            "query_type": "find"
+        }
+
+    def _do_aggregate(self, collection, args: List[Any]) -> Dict[str, Any]:
+        """Run aggregate(pipeline), also accepting stages passed as separate arguments."""
+        pipeline = args[0] if args and isinstance(args[0], list) else args
+
+        df = self._cursor_to_dataframe(collection.aggregate(pipeline, batchSize=1000))
+
+        return {
+            "data": df,
+            "rows_affected": len(df),
+            "query_type": "aggregate"
+        }
+
+    def _do_count(self, collection, args: List[Any]) -> Dict[str, Any]:
+        """Run countDocuments(filter)."""
+        query = args[0] if args and isinstance(args[0], dict) else {}
+        count = collection.count_documents(query)
+
+        return {
+            "data": pd.DataFrame({"count": [count]}),
+            "rows_affected": 1,
+            "query_type": "count"
+        }
+
+    def _do_distinct(self, collection, args: List[Any]) -> Dict[str, Any]:
+        """Run distinct(field, filter)."""
+        if not args or not isinstance(args[0], str):
+            raise ValueError("distinct requires a field name")
+
+        field = args[0]
+        query = args[1] if len(args) > 1 and isinstance(args[1], dict) else {}
+        results = collection.distinct(field, query)
+
+        return {
+            "data": pd.DataFrame({field: results}),
+            "rows_affected": len(results),
+            "query_type": "distinct"
+        }
+
+    # Collection operations supported by _execute_mql, keyed by MQL method name
+    _COLLECTION_OPERATIONS = {
+        "find": _do_find,
+        "aggregate": _do_aggregate,
+        "countDocuments": _do_count,
+        "distinct": _do_distinct,
+    }
+
     def _execute_mql(self, db, mql: str) -> Dict[str, Any]:
         """Execute MQL query on the database."""
         import json
-        import re
 
         # Remove comments and clean the query
-        mql = re.sub(r'//.*', '', mql)
+        mql = _COMMENT_RE.sub('', mql)
         mql = mql.strip()
 
         # Remove trailing semicolons (MongoDB doesn't use them)
         mql = mql.rstrip(';').strip()
 
         # First, check for direct DB operations (no collection)
-        direct_db_match = re.search(r'^db\.(\w+)\s*\((.*)\)', mql, re.DOTALL)
+        direct_db_match = _DIRECT_DB_RE.search(mql)
 
         if direct_db_match:
             operation = direct_db_match.group(1)
@@ -289,206 +408,101 @@ class MongoDBManager:
                         raise ValueError(f"{operation} requires a command parameter")
 
         # Try to detect collection-based operations
-        collection_match = re.search(r'db\.(\w+)\.(\w+)\s*\((.*)\)', mql, re.DOTALL)
+        collection_match = _MQL_RE.search(mql)
 
         if collection_match:
             collection_name = collection_match.group(1)
             operation = collection_match.group(2)
             query_str = collection_match.group(3)
 
-            collection = db[collection_name]
-
-            # Parse the query parameters
-            try:
-                # Try to parse as JSON
-                if query_str.strip():
-                    # Handle both single and multiple parameters
-                    query_str = query_str.strip()
-
-                    if query_str.startswith('['):
-                        # Aggregation pipeline
-                        try:
-                            # Convert JavaScript object notation to valid JSON
-                            quoted_str = self._quote_unquoted_keys(query_str)
-                            query_params = json.loads(quoted_str)
-                        except (json.JSONDecodeError, ValueError) as json_err:
-                            self.logger.error(f"Pipeline parsing failed: {json_err}")
-                            self.logger.debug(f"Original query: {query_str[:200]}")
-                            raise ValueError(f"Cannot parse aggregation pipeline. Query: {query_str[:100]}... Error: {json_err}")
-                    elif query_str.startswith('{'):
-                        # Single document query
-                        try:
-                            # Convert JavaScript object notation to valid JSON
-                            quoted_str = self._quote_unquoted_keys(query_str)
-                            query_params = json.loads(quoted_str)
-                        except (json.JSONDecodeError, ValueError) as json_err:
-                            self.logger.error(f"Query parsing failed: {json_err}")
-                            self.logger.debug(f"Original query: {query_str[:200]}")
-                            raise ValueError(f"Cannot parse query parameters. Query: {query_str[:100]}... Error: {json_err}")
-                    else:
-                        # Try to evaluate as Python
-                        try:
-                            js_converted = query_str.replace('true', 'True').replace('false', 'False').replace('null', 'None')
-                            query_params = eval(js_converted, {"__builtins__": {}}, {})
-                        except Exception as eval_err:
-                            self.logger.error(f"Parameter parsing failed: {eval_err}")
-                            raise ValueError(f"Cannot parse query parameters: {eval_err}")
-                else:
-                    query_params = {}
-            except ValueError:
-                # Re-raise ValueError to propagate clear error messages
-                raise
-            except Exception as e:
-                self.logger.error(f"Unexpected error parsing query parameters: {e}")
-                raise ValueError(f"Failed to parse query parameters: {e}")
-
-            # Execute based on operation
-            if operation == "find":
-                if isinstance(query_params, dict):
-                    cursor = collection.find(query_params)
-                else:
-                    cursor = collection.find({})
-
-                results = list(cursor)
-                df = pd.DataFrame(results)
-
-                # Convert ObjectId to string for display
-                if '_id' in df.columns:
-                    df['_id'] = df['_id'].astype(str)
-
-                return {
-                    "data": df,
-                    "rows_affected": len(results),
-                    "query_type": "find"
-                }
-
-            elif operation == "aggregate":
-                if isinstance(query_params, list):
-                    cursor = collection.aggregate(query_params)
-                else:
-                    cursor = collection.aggregate([query_params])
-
-                results = list(cursor)
-                df = pd.DataFrame(results)
-
-                # Convert ObjectId to string for display
-                if '_id' in df.columns:
-                    df['_id'] = df['_id'].astype(str)
-
-                return {
-                    "data": df,
-                    "rows_affected": len(results),
-                    "query_type": "aggregate"
-                }
-
-            elif operation == "countDocuments":
-                if isinstance(query_params, dict):
-                    count = collection.count_documents(query_params)
-                else:
-                    count = collection.count_documents({})
-
-                df = pd.DataFrame([{"count": count}])
+            handler = self._COLLECTION_OPERATIONS.get(operation)
+            if handler is None:
+                raise ValueError(f"Unsupported operation: {operation}")
 
-                return {
-                    "data": df,
-                    "rows_affected": 1,
-                    "query_type": "count"
-                }
+            args = self._parse_mql_arguments(query_str)
+            return handler(self, db[collection_name], args)
 
-            elif operation == "distinct":
-                # distinct needs field name and optional query
-                # Parse: distinct("field", {query})
-                params = query_str.split(',', 1)
-                field = params[0].strip().strip('"').strip("'")
-                query = json.loads(params[1]) if len(params) > 1 else {}
+        else:
+            raise ValueError(f"Could not parse MQL query: {mql}")
 
-                results = collection.distinct(field, query)
-                df = pd.DataFrame([{field: val} for val in results])
+    def _inspect_collection(self, db: Database, collection_name: str) -> Dict[str, Any]:
+        """Infer field, count and index information for a single collection."""
+        collection = db[collection_name]
+
+        # Sample documents to infer schema
+        # Use up to 100 random documents for better schema inference;
+        # the count comes from collection metadata instead of a scan
+        doc_count = collection.estimated_document_count()
+        sample_docs = list(collection.aggregate([{"$sample": {"size": 100}}]))
+        sample_size = len(sample_docs)
+
+        if not sample_docs:
+            return {
+                "fields": [],
+                "sample_count": 0,
+                "document_count": 0,
+                "indexes": []
+            }
 
-                return {
-                    "data": df,
-                    "rows_affected": len(results),
-                    "query_type": "distinct"
-                }
+        # Infer schema from samples; the first type seen for a field wins
+        field_types = {}
+        for doc in sample_docs:
+            field_types |= {
+                key: type(value).__name__
+                for key, value in doc.items()
+                if key not in field_types
+            }
 
-            else:
-                raise ValueError(f"Unsupported operation: {operation}")
+        # Track how often each field appears
+        field_frequency = Counter(key for doc in sample_docs for key in doc)
 
-        else:
-            raise ValueError(f"Could not parse MQL query: {mql}")
+        # Get indexes straight from the raw listIndexes reply, skipping the
+        # per-index cursor wrapping of list_indexes()
+        index_reply = db.command("listIndexes", collection_name, cursor={})
+        indexes = [
+            {
+                "name": index.get("name"),
+                "keys": list(index.get("key", {}).keys())
+            }
+            for index in index_reply["cursor"]["firstBatch"]
+        ]
+
+        # Calculate field frequency percentages
+        field_frequency_pct = {
+            field: f"{count}/{sample_size} ({int(count/sample_size*100)}%)"
+            for field, count in field_frequency.items()
+        }
+
+        return {
+            "fields": list(field_types),
+            "field_types": field_types,
+            "field_frequency": field_frequency_pct,
+            "document_count": doc_count,
+            "sample_count": sample_size,
+            "indexes": indexes
+        }
 
     async def get_schema_info(self, db_name: str) -> Dict[str, Any]:
         """Get comprehensive schema information for a MongoDB database."""
         try:
-            client = self.get_connection(db_name)
-            db_config = self.config.config.databases[db_name]
-
-            if not db_config.database:
-                raise ValueError("MongoDB database name not specified")
-
-            db = client[db_config.database]
+            db = self.get_db(db_name)
 
             schema_info = {
                 "collections": {},
-                "database_name": db_config.database
+                "database_name": db.name
             }
 
             # Get all collection names
             collection_names = db.list_collection_names()
 
-            for collection_name in collection_names:
-                collection = db[collection_name]
-
-                # Sample documents to infer schema
-                # Use up to 100 documents for better schema inference
-                doc_count = collection.count_documents({})
-                sample_size = min(100, doc_count)
-                sample_docs = list(collection.find().limit(sample_size))
-
-                if not sample_docs:
-                    schema_info["collections"][collection_name] = {
-                        "fields": [],
-                        "sample_count": 0,
-                        "document_count": 0,
-                        "indexes": []
-                    }
-                    continue
-
-                # Infer schema from samples
-                fields = set()
-                field_types = {}
-                field_frequency = {}  # Track how often each field appears
-
-                for doc in sample_docs:
-                    for key, value in doc.items():
-                        fields.add(key)
-                        if key not in field_types:
-                            field_types[key] = type(value).__name__
-                        # Track field frequency
-                        field_frequency[key] = field_frequency.get(key, 0) + 1
-
-                # Get indexes
-                indexes = []
-                for index in collection.list_indexes():
-                    indexes.append({
-                        "name": index.get("name"),
-                        "keys": list(index.get("key", {}).keys())
-                    })
-
-                # Calculate field frequency percentages
-                field_frequency_pct = {
-                    field: f"{count}/{sample_size} ({int(count/sample_size*100)}%)"
-                    for field, count in field_frequency.items()
-                }
-
-                schema_info["collections"][collection_name] = {
-                    "fields": list(fields),
-                    "field_types": field_types,
-                    "field_frequency": field_frequency_pct,
-                    "document_count": doc_count,
-                    "sample_count": sample_size,
-                    "indexes": indexes
-                }
+            # Introspect collections concurrently; each one costs several
+            # blocking round-trips to the server
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(None, self._inspect_collection, db, collection_name)
+                for collection_name in collection_names
+            ])
+            schema_info["collections"] = dict(zip(collection_names, results))
 
             return schema_info
 
@@ -527,7 +541,8 @@ class MongoDBManager:
         """Close a MongoDB connection."""
         if db_name in self.connections:
             try:
-                self.connections[db_name].close()
+                client, _ = self.connections[db_name]
+                client.close()
                 del self.connections[db_name]
             except Exception as e:
                 self.logger.warning(f"Error closing connection: {e}")
@@ -176,6 +176,19 @@ class TestMongoDBManager:
         assert '"foreignField"' in result
         assert '"as"' in result
 
+    def test_quote_unquoted_keys_single_quoted_strings(self):
+        """Test that single-quoted string values become JSON strings"""
+        manager = MongoDBManager(None)
+        js_str = "{genre: 'Rock', title: 'Say \"Hi\"'}"
+        result = manager._quote_unquoted_keys(js_str)
+        assert result == '{"genre": "Rock", "title": "Say \\"Hi\\""}'
+
+    def test_parse_mql_arguments_multiple_arguments(self):
+        """Test that every positional argument of an MQL call is parsed"""
+        manager = MongoDBManager(None)
+        args = manager._parse_mql_arguments("{Country: 'USA, Canada'}, {_id: 0, Name: 1}")
+        assert args == [{"Country": "USA, Canada"}, {"_id": 0, "Name": 1}]
+
 
 class TestMQLValidator:
     """Test MQL validation utility"""